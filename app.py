@@ -1,5 +1,7 @@
 from flask import Flask, jsonify, request, send_file
 import math
+import functools
+from urllib.parse import quote
 import logging
 import requests
 from io import BytesIO
@@ -46,6 +48,24 @@ if CACHE_ENABLED:
     Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
     logger.info(f"缓存已启用，缓存目录: {CACHE_DIR}")
 
+# 缓存命中的零拷贝发送方式:
+#   sendfile         - 无前置代理时，由内核 sendfile 直接把缓存文件写入客户端socket（仅 Werkzeug 内置服务器）
+#   x-accel-redirect - 返回 X-Accel-Redirect 头，由 Nginx 前置代理发送文件
+#   x-sendfile       - 返回 X-Sendfile 头，由 Apache (mod_xsendfile) 前置代理发送文件
+#   off              - 由Python工作线程分块读取并发送（默认）
+CACHE_OFFLOAD_MODES = ("sendfile", "x-accel-redirect", "x-sendfile", "off")
+CACHE_OFFLOAD = os.environ.get("CACHE_OFFLOAD", "off").lower()
+if CACHE_OFFLOAD not in CACHE_OFFLOAD_MODES:
+    logger.warning(f"未知的CACHE_OFFLOAD配置: {CACHE_OFFLOAD}, 使用默认值 off")
+    CACHE_OFFLOAD = "off"
+# X-Accel-Redirect 模式下，Nginx 中映射到 CACHE_DIR 的 internal location 前缀
+CACHE_ACCEL_PREFIX = os.environ.get("CACHE_ACCEL_PREFIX", "/amap-cache/").strip("/")
+CACHE_ACCEL_PREFIX = f"/{CACHE_ACCEL_PREFIX}/" if CACHE_ACCEL_PREFIX else "/"
+# 两种前置代理模式都先让 send_file 生成 X-Sendfile 响应（不打开文件，保留缓存相关响应头）
+app.config["USE_X_SENDFILE"] = CACHE_OFFLOAD in ("x-accel-redirect", "x-sendfile")
+if CACHE_ENABLED:
+    logger.info(f"缓存发送方式: {CACHE_OFFLOAD}")
+
 # ===== 坐标转换函数 =====
 def wgs84_to_gcj02(lng, lat):
     """WGS84转GCJ02坐标系"""
@@ -203,23 +223,72 @@ def save_tile_to_cache(z, x, y, content, style=8, ltype=None):
     except Exception as e:
         logger.error(f"缓存瓦片失败: {e}")
 
+class SocketSendfileWrapper:
+    """通过 socket.sendfile (内核 os.sendfile) 发送文件的 wsgi.file_wrapper"""
+
+    def __init__(self, sock, file, buffer_size=8192):
+        self.sock = sock
+        self.file = file
+        self.buffer_size = buffer_size
+
+    def close(self):
+        self.file.close()
+
+    def __iter__(self):
+        # 依赖 Werkzeug 开发服务器 (WSGIRequestHandler.run_wsgi) 的实现细节：
+        # 收到空数据块时即发送状态行和响应头并flush。PEP 3333 允许服务器等到首个
+        # 非空数据块才发送响应头，因此该类只能用于 Werkzeug 的 BaseWSGIServer
+        yield b""
+        self.sock.sendfile(self.file)
+
+def enable_socket_sendfile(environ):
+    """在开发服务器上为当前请求启用 sendfile 发送文件，返回是否已启用"""
+    # gunicorn 等服务器自带基于 sendfile 的 wsgi.file_wrapper，无需替换；
+    # Range 请求需要分段读取文件，保留默认实现
+    if "wsgi.file_wrapper" in environ or "HTTP_RANGE" in environ:
+        return False
+    # werkzeug.socket 和 Werkzeug/ 开头的 SERVER_SOFTWARE 均由 BaseWSGIServer 的
+    # WSGIRequestHandler 设置，其他服务器不启用
+    sock = environ.get("werkzeug.socket")
+    if sock is None or not environ.get("SERVER_SOFTWARE", "").startswith("Werkzeug/"):
+        return False
+    environ["wsgi.file_wrapper"] = functools.partial(SocketSendfileWrapper, sock)
+    return True
+
 def get_tile_from_cache(z, x, y, style=8, ltype=None):
     """从缓存获取瓦片"""
     if not CACHE_ENABLED:
         return None
     
+    sendfile_enabled = False
     try:
         cache_path = get_cache_path(z, x, y, style, ltype)
         if cache_path and cache_path.exists():
-            logger.debug(f"从缓存读取瓦片: z={z}, x={x}, y={y}, style={style}, ltype={ltype}")
-            return send_file(
+            logger.debug(f"从缓存读取瓦片: z={z}, x={x}, y={y}, style={style}, ltype={ltype}, 发送方式: {CACHE_OFFLOAD}")
+            if CACHE_OFFLOAD == "sendfile":
+                sendfile_enabled = enable_socket_sendfile(request.environ)
+            response = send_file(
                 cache_path,
                 mimetype='image/jpeg',
                 as_attachment=False,
                 max_age=86400
             )
+            # 路径中的 ltype 来自查询参数，写入响应头前需要URL编码，避免 ? 等字符和非Latin-1字符
+            sendfile_path = response.headers.pop("X-Sendfile", None)
+            if CACHE_OFFLOAD == "x-sendfile" and sendfile_path:
+                # mod_xsendfile 默认 (XSendFileUnescape On) 会先解码路径再发送文件
+                response.headers["X-Sendfile"] = quote(sendfile_path)
+            elif CACHE_OFFLOAD == "x-accel-redirect" and sendfile_path:
+                # 304 响应没有响应体，无需交给 Nginx 处理
+                if response.status_code != 304:
+                    relative_path = quote(cache_path.relative_to(CACHE_DIR).as_posix())
+                    response.headers["X-Accel-Redirect"] = CACHE_ACCEL_PREFIX + relative_path
+            return response
     except Exception as e:
         logger.error(f"读取缓存瓦片失败: {e}")
+        # 回退到上游获取时不能继续使用 sendfile 包装器发送 BytesIO
+        if sendfile_enabled:
+            request.environ.pop("wsgi.file_wrapper", None)
     
     return None
 
@@ -231,7 +300,7 @@ __all__ = [
     'app', 'fetch_amap_tile', 'tile_to_lnglat', 'lnglat_to_tile', 
     'wgs84_to_gcj02', 'is_wgs84_source', 'CACHE_ENABLED', 'GEOIP_ENABLED',
     'GEOIP_DB_PATH', 'get_tile_from_cache', 'save_tile_to_cache',
-    'load_exception_rules'
+    'load_exception_rules', 'CACHE_OFFLOAD'
 ]
 
 def fetch_amap_tile(z, x, y, style=8, ltype=None):
@@ -529,6 +598,7 @@ def health():
         "exception_rules_loaded": len(load_exception_rules()),
         "geoip_enabled": GEOIP_ENABLED,
         "geoip_db_path": GEOIP_DB_PATH if GEOIP_ENABLED else None,
+        "cache_offload": CACHE_OFFLOAD if CACHE_ENABLED else None,
         "timestamp": datetime.now().isoformat()
     })
 
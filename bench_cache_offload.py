@@ -0,0 +1,110 @@
+"""缓存命中发送方式 (CACHE_OFFLOAD) 的性能对比脚本
+
+依次以每种 CACHE_OFFLOAD 模式启动 app.py，请求同一个已缓存的瓦片 N 次，
+统计服务进程每次命中消耗的CPU时间（用户态 + 内核态）。
+
+注意：
+- 通过 /proc/<pid>/stat 读取CPU时间，仅支持Linux
+- x-accel-redirect / x-sendfile 模式只统计应用本身，前置代理发送文件的开销不计入
+
+用法: python bench_cache_offload.py [-n 300] [--size 2000000] [--modes off sendfile]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+MODES = ("off", "sendfile", "x-accel-redirect", "x-sendfile")
+TILE = (10, 500, 300)
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def free_port():
+    """获取一个空闲端口"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def process_cpu_seconds(pid):
+    """读取进程累计CPU时间（秒）"""
+    with open(f"/proc/{pid}/stat") as f:
+        # 第二个字段 (comm) 可能包含空格，从右括号之后开始分割
+        fields = f.read().rsplit(")", 1)[1].split()
+    utime, stime = int(fields[11]), int(fields[12])
+    return (utime + stime) / os.sysconf("SC_CLK_TCK")
+
+def wait_ready(base_url, timeout=15):
+    """等待服务启动"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/health", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("服务启动超时")
+
+def fetch_tile(url, mode):
+    """请求一次瓦片"""
+    with urllib.request.urlopen(url) as response:
+        # 前置代理模式下响应体为空，但 Content-Length 仍为文件大小，不读取响应体
+        if mode not in ("x-accel-redirect", "x-sendfile"):
+            response.read()
+
+def run_mode(mode, cache_dir, requests_count):
+    """以指定模式启动服务并返回每次命中的CPU秒数"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        CACHE_ENABLED="true",
+        CACHE_DIR=cache_dir,
+        CACHE_OFFLOAD=mode,
+        GEOIP_ENABLED="false",
+        LOG_LEVEL="WARNING",
+        PORT=str(port),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "app.py"], cwd=APP_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_ready(base_url)
+        z, x, y = TILE
+        url = f"{base_url}/tile?z={z}&x={x}&y={y}"
+        # 预热一次，避免首次请求的导入等开销计入统计
+        fetch_tile(url, mode)
+
+        cpu_before = process_cpu_seconds(proc.pid)
+        for _ in range(requests_count):
+            fetch_tile(url, mode)
+        cpu_after = process_cpu_seconds(proc.pid)
+        return (cpu_after - cpu_before) / requests_count
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="对比 CACHE_OFFLOAD 各模式下缓存命中的CPU开销")
+    parser.add_argument("-n", "--requests", type=int, default=300, help="每种模式的请求次数")
+    parser.add_argument("--size", type=int, default=2_000_000, help="缓存瓦片大小（字节）")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="要测试的模式")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        z, x, y = TILE
+        tile_dir = Path(cache_dir) / str(z) / str(x // 100) / "style_8"
+        tile_dir.mkdir(parents=True)
+        (tile_dir / f"{x}_{y}.jpg").write_bytes(os.urandom(args.size))
+
+        print(f"瓦片大小: {args.size} 字节, 每种模式请求 {args.requests} 次")
+        for mode in args.modes:
+            per_hit = run_mode(mode, cache_dir, args.requests)
+            print(f"{mode:<18} {per_hit * 1000:8.3f} ms CPU/次命中")
+
+if __name__ == "__main__":
+    main()
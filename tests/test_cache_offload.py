@@ -0,0 +1,116 @@
+"""缓存命中发送方式 (CACHE_OFFLOAD) 测试"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.request
+from pathlib import Path
+from unittest import mock
+
+# 导入前关闭缓存，避免在工作目录创建 config/settings.conf 中的缓存目录
+os.environ["CACHE_ENABLED"] = "false"
+os.environ["GEOIP_ENABLED"] = "false"
+
+from werkzeug.serving import make_server
+
+import app
+
+Z, X, Y = 10, 500, 300
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CacheOffloadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.content = os.urandom(200000)
+        tile_dir = Path(self.cache_dir) / str(Z) / str(X // 100) / "style_8"
+        tile_dir.mkdir(parents=True)
+        for ltype in (None, "中?x"):
+            suffix = f"_{ltype}" if ltype else ""
+            (tile_dir / f"{X}_{Y}{suffix}.jpg").write_bytes(self.content)
+
+        patches = [
+            mock.patch.object(app, "CACHE_ENABLED", True),
+            mock.patch.object(app, "CACHE_DIR", self.cache_dir),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def set_offload(self, mode):
+        p = mock.patch.object(app, "CACHE_OFFLOAD", mode)
+        p.start()
+        self.addCleanup(p.stop)
+        use_x_sendfile = app.app.config["USE_X_SENDFILE"]
+        app.app.config["USE_X_SENDFILE"] = mode in ("x-accel-redirect", "x-sendfile")
+        self.addCleanup(app.app.config.__setitem__, "USE_X_SENDFILE", use_x_sendfile)
+
+    def test_default_is_off(self):
+        env = {k: v for k, v in os.environ.items() if k != "CACHE_OFFLOAD"}
+        result = subprocess.run(
+            [sys.executable, "-c", "import app; print(app.CACHE_OFFLOAD)"],
+            cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), "off")
+
+    def test_sendfile_on_werkzeug_server(self):
+        """依赖 Werkzeug run_wsgi 在空数据块时发送响应头，升级 Werkzeug 后需保证该测试通过"""
+        self.set_offload("sendfile")
+        used = []
+
+        class RecordingWrapper(app.SocketSendfileWrapper):
+            def __iter__(self):
+                used.append(self.file.name)
+                return super().__iter__()
+
+        server = make_server("127.0.0.1", 0, app.app)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+
+        url = f"http://127.0.0.1:{server.server_port}/tile?z={Z}&x={X}&y={Y}&ltype=%E4%B8%AD%3Fx"
+        with mock.patch.object(app, "SocketSendfileWrapper", RecordingWrapper):
+            with urllib.request.urlopen(url) as response:
+                body = response.read()
+                self.assertEqual(response.headers["Cache-Control"], "public, max-age=86400")
+        self.assertEqual(body, self.content)
+        self.assertEqual(len(used), 1)
+
+    def test_sendfile_skipped_without_werkzeug_server(self):
+        self.set_offload("sendfile")
+        response = app.app.test_client().get(f"/tile?z={Z}&x={X}&y={Y}")
+        self.assertEqual(response.data, self.content)
+
+    def test_x_accel_redirect_encodes_path(self):
+        self.set_offload("x-accel-redirect")
+        response = app.app.test_client().get(f"/tile?z={Z}&x={X}&y={Y}&ltype=%E4%B8%AD%3Fx")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Sendfile", response.headers)
+        self.assertEqual(
+            response.headers["X-Accel-Redirect"],
+            f"/amap-cache/{Z}/{X // 100}/style_8/{X}_{Y}_%E4%B8%AD%3Fx.jpg"
+        )
+
+    def test_x_accel_redirect_skipped_for_304(self):
+        self.set_offload("x-accel-redirect")
+        client = app.app.test_client()
+        etag = client.get(f"/tile?z={Z}&x={X}&y={Y}").headers["ETag"]
+        response = client.get(f"/tile?z={Z}&x={X}&y={Y}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("X-Accel-Redirect", response.headers)
+
+    def test_x_sendfile_encodes_path(self):
+        self.set_offload("x-sendfile")
+        response = app.app.test_client().get(f"/tile?z={Z}&x={X}&y={Y}&ltype=%E4%B8%AD%3Fx")
+        header = response.headers["X-Sendfile"]
+        header.encode("latin-1")
+        self.assertTrue(header.endswith(f"/{X}_{Y}_%E4%B8%AD%3Fx.jpg"))
+
+
+if __name__ == "__main__":
+    unittest.main()